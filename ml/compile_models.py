@@ -0,0 +1,139 @@
+import os
+import sys
+import numpy as np
+import xgboost as xgb
+import treelite
+import tl2cgen
+
+# =========================
+# 1. CONFIGURATION
+# =========================
+# Offline step: compile the trained XGBoost models into model-specific C code
+# (Treelite) and ONNX graphs so all_predict.py can serve them without the
+# XGBoost Python wrapper (plus UBJSON copies for the XGBoost fallback).
+# Re-run after every retrain.
+
+VOL_MODEL_PATH = "nifty_vol_final.json"
+DIR_MODEL_PATH = "nifty_direction_hybrid.json"
+
+VOL_LIB_PATH = "nifty_vol_final.so"
+DIR_LIB_PATH = "nifty_direction_hybrid.so"
+
+VOL_ONNX_PATH = "nifty_vol_final.onnx"
+DIR_ONNX_PATH = "nifty_direction_hybrid.onnx"
+
+VOL_UBJ_PATH = "nifty_vol_final.ubj"
+DIR_UBJ_PATH = "nifty_direction_hybrid.ubj"
+
+TOOLCHAIN = "gcc"
+PARALLEL_COMP = 8  # Split generated C into N translation units (faster gcc)
+
+# =========================
+# 2. COMPILE
+# =========================
+def load_booster(model_path):
+    # Keep only the trees up to the early-stopping best iteration, which is
+    # what XGBRegressor/XGBClassifier.predict would use
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    best_iteration = booster.attributes().get("best_iteration")
+    if best_iteration is not None:
+        booster = booster[: int(best_iteration) + 1]
+    return booster
+
+def compile_model(model_path, lib_path):
+    print(f"Compiling {model_path} -> {lib_path}...")
+    tl_model = treelite.frontend.from_xgboost(load_booster(model_path))
+    tl2cgen.export_lib(tl_model, toolchain=TOOLCHAIN, libpath=lib_path,
+                       params={"parallel_comp": PARALLEL_COMP})
+
+def export_onnx(model_path, model_cls, onnx_path):
+    # ONNX tooling is only imported here, so train.py's Treelite rebuild doesn't load it
+    from onnxmltools import convert_xgboost
+    from onnxmltools.convert.common.data_types import FloatTensorType
+    # The sklearn wrapper carries best_iteration, so the converter truncates the same way
+    print(f"Exporting {model_path} -> {onnx_path}...")
+    model = model_cls()
+    model.load_model(model_path)
+    n_feats = model.get_booster().num_features()
+    onx = convert_xgboost(model, initial_types=[("X", FloatTensorType([None, n_feats]))])
+    with open(onnx_path, "wb") as f:
+        f.write(onx.SerializeToString())
+
+def export_ubj(model_path, ubj_path):
+    # Same model in XGBoost's binary UBJSON format: loads several times faster than JSON
+    print(f"Exporting {model_path} -> {ubj_path}...")
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    booster.save_model(ubj_path)
+
+# =========================
+# 3. VALIDATE
+# =========================
+# An artifact that fails validation is deleted: all_predict.py / predict.py
+# serve any compiled file newer than its JSON, so a bad one must not be left behind
+def validate(model_path, lib_path, n_rows=1000):
+    # Compiled predictions must match XGBoost on the same float32 inputs
+    booster = load_booster(model_path)
+    n_feats = booster.num_features()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(n_rows, n_feats)).astype(np.float32)
+
+    expected = booster.inplace_predict(X)
+    predictor = tl2cgen.Predictor(lib_path, nthread=1)
+    got = predictor.predict(tl2cgen.DMatrix(X)).ravel()
+
+    max_err = float(np.max(np.abs(expected - got)))
+    print(f"Max abs diff vs XGBoost: {max_err:.2e}")
+    return max_err < 1e-4
+
+def validate_onnx(model_path, onnx_path, n_rows=1000):
+    import onnxruntime as ort
+    booster = load_booster(model_path)
+    n_feats = booster.num_features()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(n_rows, n_feats)).astype(np.float32)
+
+    expected = booster.inplace_predict(X)
+    sess = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+    outputs = sess.run(None, {"X": X})
+    # Regressor -> [variable (N,1)], Classifier -> [label (N,), probabilities (N,2)]
+    got = outputs[0].ravel() if len(outputs) == 1 else outputs[1][:, 1]
+
+    max_err = float(np.max(np.abs(expected - got)))
+    print(f"Max abs diff vs XGBoost (ONNX): {max_err:.2e}")
+    return max_err < 1e-4
+
+def build_library(model_path, lib_path):
+    """Compile to a temporary path and move it into place only if it validates."""
+    root, ext = os.path.splitext(lib_path)
+    tmp_path = f"{root}.tmp{ext}"
+    compile_model(model_path, tmp_path)
+    if not validate(model_path, tmp_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, lib_path)
+    return True
+
+if __name__ == "__main__":
+    ok = True
+    for model_path, lib_path in [(VOL_MODEL_PATH, VOL_LIB_PATH), (DIR_MODEL_PATH, DIR_LIB_PATH)]:
+        ok &= build_library(model_path, lib_path)
+
+    for model_path, model_cls, onnx_path in [(VOL_MODEL_PATH, xgb.XGBRegressor, VOL_ONNX_PATH),
+                                             (DIR_MODEL_PATH, xgb.XGBClassifier, DIR_ONNX_PATH)]:
+        export_onnx(model_path, model_cls, onnx_path)
+        if not validate_onnx(model_path, onnx_path):
+            os.remove(onnx_path)
+            ok = False
+
+    for model_path, ubj_path in [(VOL_MODEL_PATH, VOL_UBJ_PATH), (DIR_MODEL_PATH, DIR_UBJ_PATH)]:
+        export_ubj(model_path, ubj_path)
+
+    if ok:
+        print("Success.")
+    else:
+        print("CRITICAL ERROR: Compiled model output does not match XGBoost (mismatching files removed).")
+        sys.exit(1)
@@ -4,6 +4,7 @@ import xgboost as xgb
 from sqlalchemy import create_engine
 import sys
 import os
+from feature_kernels import ffill
 
 # =========================
 # 1. SETUP
@@ -24,8 +25,11 @@ if not os.path.exists(model_path):
     sys.exit(1)
 
 try:
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
+    # Raw Booster: one native inplace_predict call, no sklearn wrapper / DMatrix
+    booster = xgb.Booster(model_file=model_path)
+    booster.set_param({"nthread": 1})
+    # inplace_predict ignores best_iteration; use the same trees as predict_proba
+    iteration_range = (0, int(booster.attr("best_iteration") or -1) + 1)
     print("Model loaded successfully.")
 except Exception as e:
     print(f"Error loading model: {e}")
@@ -34,59 +38,74 @@ except Exception as e:
 # =========================
 # 2. FEATURE ENGINEERING (MATCHING TRAIN_DIRECTION.PY)
 # =========================
+def window(a, n):
+    # Trailing n values; all-NaN on shorter history, where pandas rolling(n) gives NaN
+    return a[-n:] if len(a) >= n else np.full(n, np.nan)
+
+def lag(a, k):
+    # Value k bars back, NaN on shorter history (as shift(k) gives)
+    return a[-1 - k] if len(a) > k else np.nan
+
 def generate_features(df):
-    df = df.copy()
+    """Features for the last row only, as scalars from trailing windows (no full-frame copy)."""
+    c = df["close"].to_numpy(dtype=np.float64)
+    h = df["high"].to_numpy(dtype=np.float64)
+    l = df["low"].to_numpy(dtype=np.float64)
+    vix = df["vix"].to_numpy(dtype=np.float64)
+    feat = {"close": c[-1], "vix": vix[-1]}
     
     # 1. Base Calcs
-    df["ret"] = np.log(df["close"] / df["close"].shift(1))
-    df["rv_5"] = df["ret"].rolling(5).std()
-    df["rv_30"] = df["ret"].rolling(30).std()
+    ret = np.empty_like(c)
+    ret[0] = np.nan
+    ret[1:] = np.log(c[1:] / c[:-1])
+    feat["ret"] = ret[-1]
+    feat["rv_5"] = np.std(window(ret, 5), ddof=1)
+    feat["rv_30"] = np.std(window(ret, 30), ddof=1)
     
     # 2. Volatility Regime
-    df["vol_regime"] = df["rv_5"] / (df["rv_30"] + 1e-9)
+    feat["vol_regime"] = feat["rv_5"] / (feat["rv_30"] + 1e-9)
     
     # 3. Parkinson Vol
-    df["parkinson"] = ((1.0 / (4.0 * np.log(2.0))) * (np.log(df["high"] / df["low"]) ** 2)).rolling(15).mean()
+    feat["parkinson"] = ((1.0 / (4.0 * np.log(2.0))) * (np.log(window(h, 15) / window(l, 15)) ** 2)).mean()
     
     # 4. RSI-14 (Manual Calculation to match training)
-    delta = df["close"].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    # The first bar has no previous close: its diff counts as 0 (pandas where() fills the NaN)
+    delta = window(np.diff(c[-15:], prepend=c[-15:][:1]), 14)
+    gain = np.maximum(delta, 0).mean()
+    loss = np.maximum(-delta, 0).mean()
     rs = gain / (loss + 1e-9)
-    df["rsi"] = 100 - (100 / (1 + rs))
+    feat["rsi"] = 100 - (100 / (1 + rs))
     
     # 5. Trend Strength (MACD Proxy)
-    df["trend_strength"] = (df["close"].rolling(5).mean() - df["close"].rolling(20).mean())
+    feat["trend_strength"] = window(c, 5).mean() - window(c, 20).mean()
     
     # 6. VIX Interaction
     # Vix Return
-    df["vix_ret"] = np.log(df["vix"] / df["vix"].shift(1))
+    feat["vix_ret"] = np.log(vix[-1] / lag(vix, 1))
     # Vix Momentum
-    df["vix_mom_5"] = df["vix"] - df["vix"].shift(5)
+    feat["vix_mom_5"] = vix[-1] - lag(vix, 5)
     # Inverse Vix (The Feature)
-    df["vix_inv"] = df["vix_mom_5"] * -1
+    feat["vix_inv"] = feat["vix_mom_5"] * -1
     
     # 7. Vol Spike (Synthetic Volume)
-    # FIX: Replaced .fillna(method='ffill') with .ffill() for Pandas 2.0+
-    vol = df["volume"].replace(0, np.nan).ffill()
-    vol_mean = vol.rolling(15).mean() + 1
-    df["vol_spike"] = vol / vol_mean
+    # Zero/missing volume carried forward in one compiled pass (same ffill as the live engine)
+    vol = ffill(df["volume"].to_numpy(dtype=np.float64, na_value=np.nan), np.nan, True)
+    feat["vol_spike"] = vol[-1] / (window(vol, 15).mean() + 1)
     
     # 8. Dispersion (Placeholder if not live)
-    df["dispersion"] = 0.0 # Unless you calculate it live
+    feat["dispersion"] = 0.0 # Unless you calculate it live
     
     # 9. Lags
-    df["ret_lag_1"] = df["ret"].shift(1)
-    df["ret_lag_5"] = df["ret"].shift(5)
+    feat["ret_lag_1"] = lag(ret, 1)
+    feat["ret_lag_5"] = lag(ret, 5)
     
     # 10. Time
-    df_ist = df.index.tz_localize("UTC").tz_convert(IST)
-    minutes = df_ist.hour * 60 + df_ist.minute
-    minute_of_day = minutes - 555 
-    df["sin_time"] = np.sin(2 * np.pi * minute_of_day / 375.0)
-    df["cos_time"] = np.cos(2 * np.pi * minute_of_day / 375.0)
+    ts_ist = df.index[-1].tz_localize("UTC").tz_convert(IST)
+    minute_of_day = (ts_ist.hour * 60 + ts_ist.minute) - 555
+    feat["sin_time"] = np.sin(2 * np.pi * minute_of_day / 375.0)
+    feat["cos_time"] = np.cos(2 * np.pi * minute_of_day / 375.0)
     
-    return df
+    return pd.DataFrame([feat], index=[df.index[-1]])
 
 # =========================
 # 3. FETCH & PREDICT
@@ -94,20 +113,19 @@ def generate_features(df):
 print("--- STEP 2: Fetching Live Data ---")
 # Need roughly 50 rows for MA20, RSI14, Rolling30
 query = """
-    SELECT n.timestamp, n.open, n.high, n.low, n.close, n.volume, v.close as vix
+    SELECT n.timestamp, n.high, n.low, n.close, n.volume, v.close as vix
     FROM nifty_spot_1min n
     JOIN india_vix_1min v ON n.timestamp = v.timestamp
     ORDER BY n.timestamp DESC
     LIMIT 100
 """
-df_live = pd.read_sql(query, engine, parse_dates=["timestamp"])
+df_live = pd.read_sql(query, engine)
 df_live.set_index("timestamp", inplace=True)
 df_live = df_live.sort_index()
 
 # Generate Features
 print("--- STEP 3: Engineering & Predicting ---")
-df_features = generate_features(df_live)
-latest_row = df_features.iloc[[-1]].copy()
+latest_row = generate_features(df_live)
 
 # Feature List (MUST BE EXACT 14 FEATURES)
 features = [
@@ -117,13 +135,13 @@ features = [
     'sin_time', 'cos_time'
 ]
 
-X_live = latest_row[features]
+# float32 row: the dtype XGBoost evaluates in (NaN stays missing, as in training)
+X_live = latest_row[features].to_numpy(dtype=np.float32)
 
 # Predict Probability (Class 1 = UP)
-# Returns [prob_down, prob_up]
-probs = model.predict_proba(X_live)[0]
-prob_up = probs[1]
-prob_down = probs[0]
+# binary:logistic returns P(UP) directly
+prob_up = float(booster.inplace_predict(X_live, iteration_range=iteration_range)[0])
+prob_down = 1.0 - prob_up
 
 # Output
 timestamp_ist = latest_row.index[0].tz_localize("UTC").tz_convert(IST)
@@ -5,6 +5,7 @@ from sqlalchemy import create_engine
 from sklearn.metrics import accuracy_score, precision_score, recall_score, confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
+from feature_kernels import rolling_rsi, trend_strength
 
 # =========================
 # 1. SETUP & LOAD
@@ -16,7 +17,9 @@ print("--- STEP 1: Loading Data ---")
 query = "SELECT * FROM nifty_volatility_features_1min ORDER BY timestamp ASC"
 df = pd.read_sql(query, engine, parse_dates=["timestamp"])
 df.set_index("timestamp", inplace=True)
-df.sort_index(inplace=True)
+# Already ORDER BY timestamp: an O(N) check instead of an unconditional sort
+if not df.index.is_monotonic_increasing:
+    df.sort_index(inplace=True)
 
 # =========================
 # 2. FEATURE ENGINEERING (HYBRID)
@@ -27,15 +30,12 @@ print("--- STEP 2: Engineering Hybrid Features ---")
 df["vol_regime"] = df["rv_5"] / (df["rv_30"] + 1e-9)
 
 # B. Momentum Indicators
-# RSI-14
-delta = df["close"].diff()
-gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-rs = gain / (loss + 1e-9)
-df["rsi"] = 100 - (100 / (1 + rs))
-
-# Trend Strength
-df["trend_strength"] = (df["close"].rolling(5).mean() - df["close"].rolling(20).mean())
+# RSI-14 (simple 14-bar averages, compiled)
+close = df["close"].to_numpy(dtype=np.float64)
+df["rsi"] = rolling_rsi(close, 14)
+
+# Trend Strength (SMA 5 - SMA 20)
+df["trend_strength"] = trend_strength(close, 5, 20)
 
 # C. VIX Interaction
 df["vix_inv"] = df["vix_mom_5"] * -1
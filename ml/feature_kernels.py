@@ -0,0 +1,361 @@
+import math
+import numpy as np
+from numba import guvectorize, njit
+
+# =========================
+# 1. KERNEL CONFIG
+# =========================
+# Compiled (Numba) versions of the feature formulas. Same math as
+# main.py / direction_train.py: the live kernel evaluates the latest bar only,
+# the bulk kernels fill whole columns for main.py.
+
+# fastmath without 'nnan'/'ninf': NaN propagation must match pandas rolling
+FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+F32_MAX = float(np.finfo(np.float32).max)
+
+LN2_K = 1.0 / (4.0 * math.log(2.0))
+GK_K = 2 * math.log(2) - 1
+
+# Output layout of compute_features (constituent returns follow, in column order)
+BASE_FEATURES = [
+    "close", "ret",
+    "rv_5_std", "rv_30_std", "vol_regime_std",
+    "rv_5_sum", "rv_15_sum", "rv_30_sum", "vol_regime_sum", "vol_trend_sum",
+    "parkinson", "gk", "range", "abs_return", "std_15",
+    "vol_spike_const", "vol_spike_nifty",
+    "vix", "vix_ret", "vix_mom_5", "vix_inv",
+    "dispersion", "constituent_rv",
+    "rsi", "trend_strength", "past_vol_15", "ret_lag_1", "ret_lag_5",
+    "vol_lag_15", "vol_lag_30", "vol_lag_60", "vol_lag_day",
+]
+N_BASE = len(BASE_FEATURES)
+
+# Session-time encoding: minute_of_day (0 at 09:15 IST) has period 375, so
+# sin_time / cos_time are table lookups at index minute_of_day % 375
+SESSION_MINUTES = 375
+_minutes = np.arange(SESSION_MINUTES)
+SIN_TIME = np.sin(2 * np.pi * _minutes / SESSION_MINUTES)
+COS_TIME = np.cos(2 * np.pi * _minutes / SESSION_MINUTES)
+
+# Shared by main.py and diagnose.py, so their market-hours filters cannot drift apart
+IST_OFFSET_MIN = 330
+
+def ist_minutes(index):
+    # Minute of day in IST from the UTC epoch minutes (IST is a fixed
+    # UTC+05:30, no DST), without materializing .hour / .minute
+    return (index.values.astype("datetime64[m]").astype(np.int64) + IST_OFFSET_MIN) % 1440
+
+# =========================
+# 2. WINDOW HELPERS
+# =========================
+# Each reduces a[end - w:end]; NaN if history is too short or the window has a
+# NaN (pandas rolling with min_periods=w).
+
+@njit(cache=True, fastmath=FASTMATH)
+def _mean(a, end, w):
+    if end < w: return np.nan
+    s = 0.0
+    for i in range(end - w, end):
+        s += a[i]
+    return s / w
+
+@njit(cache=True, fastmath=FASTMATH)
+def _std(a, end, w):
+    if end < w: return np.nan
+    m = _mean(a, end, w)
+    ss = 0.0
+    for i in range(end - w, end):
+        d = a[i] - m
+        ss += d * d
+    return math.sqrt(ss / (w - 1))
+
+@njit(cache=True, fastmath=FASTMATH)
+def _rss(a, end, w):
+    # Root of summed squares (realized vol)
+    if end < w: return np.nan
+    ss = 0.0
+    for i in range(end - w, end):
+        ss += a[i] * a[i]
+    return math.sqrt(ss)
+
+@njit(cache=True, fastmath=FASTMATH)
+def _ret_std(c, end, w):
+    # _std of the log returns of c, computed from the closes (no returns array)
+    if end - w < 1: return np.nan
+    s = 0.0
+    for i in range(end - w, end):
+        s += math.log(c[i] / c[i - 1])
+    m = s / w
+    ss = 0.0
+    for i in range(end - w, end):
+        d = math.log(c[i] / c[i - 1]) - m
+        ss += d * d
+    return math.sqrt(ss / (w - 1))
+
+@njit(cache=True, fastmath=FASTMATH)
+def ffill(x, last, zero_as_nan):
+    """Forward-fill x, continuing from the previous valid value `last`."""
+    out = np.empty_like(x)
+    for i in range(x.shape[0]):
+        v = x[i]
+        if not (np.isnan(v) or (zero_as_nan and v == 0.0)):
+            last = v
+        out[i] = last
+    return out
+
+# =========================
+# 3. FEATURE KERNEL
+# =========================
+@njit(cache=True, fastmath=FASTMATH, boundscheck=False)
+def compute_features(o, h, l, c, v, vix, stock_close, stock_vol):
+    """Feature vector (BASE_FEATURES + constituent returns) for the last bar."""
+    n = c.shape[0]
+    k = stock_close.shape[1]
+    out = np.full(N_BASE + k, np.nan)
+
+    # --- A. BASE CALCULATIONS ---
+    # Only the last 30 returns are read; older windows (vol lags) use _ret_std
+    ret = np.full(n, np.nan)
+    for i in range(max(1, n - 30), n):
+        ret[i] = math.log(c[i] / c[i - 1])
+    out[0] = c[n - 1]
+    out[1] = ret[n - 1]
+
+    # --- B. SPLIT VOLATILITY ---
+    out[2] = _std(ret, n, 5)
+    out[3] = _std(ret, n, 30)
+    out[4] = out[2] / (out[3] + 1e-9)
+
+    out[5] = _rss(ret, n, 5)
+    out[6] = _rss(ret, n, 15)
+    out[7] = _rss(ret, n, 30)
+    out[8] = out[5] / (out[7] + 1e-9)
+    out[9] = out[5] - out[6]
+
+    # --- C. COMMON FEATURES ---
+    if n >= 15:
+        park = 0.0
+        gk = 0.0
+        for i in range(n - 15, n):
+            hl2 = math.log(h[i] / l[i]) ** 2
+            park += LN2_K * hl2
+            gk += 0.5 * hl2 - GK_K * math.log(c[i] / o[i]) ** 2
+        out[10] = park / 15
+        out[11] = gk / 15
+    out[12] = h[n - 1] - l[n - 1]
+    out[13] = abs(c[n - 1] - o[n - 1])
+    out[14] = _std(c, n, 15)
+
+    # --- D. VOL SPIKES ---
+    if n >= 15:
+        # Constituent volume: NaN-skipping row sum (pandas sum(axis=1))
+        tcv_sum = 0.0
+        tcv_last = 0.0
+        for i in range(n - 15, n):
+            row = 0.0
+            for j in range(k):
+                if not np.isnan(stock_vol[i, j]):
+                    row += stock_vol[i, j]
+            tcv_sum += row
+            tcv_last = row
+        out[15] = tcv_last / (tcv_sum / 15 + 1)
+
+    # Nifty volume and VIX arrive forward-filled (see ffill)
+    out[16] = v[n - 1] / (_mean(v, n, 15) + 1)
+
+    # --- E. VIX & CONSTITUENTS ---
+    out[17] = vix[n - 1]
+    if n >= 2: out[18] = math.log(vix[n - 1] / vix[n - 2])
+    if n >= 6: out[19] = vix[n - 1] - vix[n - 6]
+    out[20] = -out[19]
+
+    if n >= 6:
+        # Returns of the last 5 bars per constituent, against the stock's own
+        # previous candle (a missing bar is NaN, not a gap in the return)
+        rets = np.empty((5, k))
+        for j in range(k):
+            prev = np.nan
+            for i in range(n - 6, -1, -1):
+                if not np.isnan(stock_close[i, j]):
+                    prev = stock_close[i, j]
+                    break
+            for i in range(5):
+                cur = stock_close[n - 5 + i, j]
+                rets[i, j] = math.log(cur / prev)
+                if not np.isnan(cur):
+                    prev = cur
+
+        # Dispersion: NaN-skipping cross-sectional std (ddof=1) of the last bar
+        cnt = 0
+        s = 0.0
+        for j in range(k):
+            if not np.isnan(rets[4, j]):
+                cnt += 1
+                s += rets[4, j]
+        if cnt >= 2:
+            m = s / cnt
+            ss = 0.0
+            for j in range(k):
+                if not np.isnan(rets[4, j]):
+                    ss += (rets[4, j] - m) ** 2
+            out[21] = math.sqrt(ss / (cnt - 1))
+
+        # Constituent RV: NaN-skipping mean of per-stock 5-bar realized vol
+        cnt = 0
+        s = 0.0
+        for j in range(k):
+            ss = 0.0
+            for i in range(5):
+                ss += rets[i, j] * rets[i, j]
+            if not np.isnan(ss):
+                cnt += 1
+                s += math.sqrt(ss)
+        if cnt > 0:
+            out[22] = s / cnt
+
+        for j in range(k):
+            out[N_BASE + j] = rets[4, j]
+
+    # --- F. TECHNICALS ---
+    if n >= 15:
+        # Simple 14-bar averages as in training (not Wilder smoothing); max() keeps it branchless
+        gain = 0.0
+        loss = 0.0
+        for i in range(n - 14, n):
+            d = c[i] - c[i - 1]
+            gain += max(d, 0.0)
+            loss += max(-d, 0.0)
+        gain /= 14
+        loss /= 14
+        out[23] = 100 - (100 / (1 + (gain / (loss + 1e-9))))
+    if n >= 20:
+        # SMA 5 and SMA 20 in one pass over the last 20 closes
+        s5 = 0.0
+        s20 = 0.0
+        for i in range(n - 20, n - 5):
+            s20 += c[i]
+        for i in range(n - 5, n):
+            s5 += c[i]
+        s20 += s5
+        out[24] = s5 / 5 - s20 / 20
+
+    out[25] = _std(ret, n, 15)
+    if n >= 2: out[26] = ret[n - 2]
+    if n >= 6: out[27] = ret[n - 6]
+
+    # Lags of past_vol_15: the same 15-bar window, ending `lag` bars back
+    out[28] = _ret_std(c, n - 15, 15)
+    out[29] = _ret_std(c, n - 30, 15)
+    out[30] = _ret_std(c, n - 60, 15)
+    out[31] = _ret_std(c, n - 375, 15)
+
+    return out
+
+@njit(cache=True, boundscheck=False)
+def gather_inputs(feat, idx, out):
+    """Model input row: out[0, i] = feat[idx[i]] in float32, NaN -> 0 (np.nan_to_num)."""
+    for i in range(idx.shape[0]):
+        v = feat[idx[i]]
+        if np.isnan(v): v = 0.0
+        elif v > F32_MAX: v = F32_MAX
+        elif v < -F32_MAX: v = -F32_MAX
+        out[0, i] = v
+
+def warm_up(n_stocks, n_bars=400):
+    """Compile (or load from cache) before the first live tick."""
+    x = np.ones(n_bars)
+    m = np.ones((n_bars, n_stocks))
+    compute_features(x, x, x, x, x, x, m, m)
+    ffill(x, np.nan, True)
+    gather_inputs(x, np.arange(n_stocks), np.zeros((1, n_stocks), dtype=np.float32))
+
+# =========================
+# 4. BULK KERNELS (training pipelines)
+# =========================
+@guvectorize(["void(float64[:], int64[:], float64[:, :])"], "(n),(k)->(n,k)",
+             cache=True, fastmath=FASTMATH)
+def rolling_rss(x, windows, out):
+    """Rolling realized vol of x for several ascending windows in one pass."""
+    # Each row walks back over the longest window once; shorter windows are its
+    # partial sums. NaN propagates as in pandas rolling(w) with min_periods=w.
+    n = x.shape[0]
+    for i in range(n):
+        ss = 0.0
+        back = 0
+        for j in range(windows.shape[0]):
+            w = windows[j]
+            if i + 1 < w:
+                out[i, j] = np.nan
+                continue
+            while back < w:
+                v = x[i - back]
+                ss += v * v
+                back += 1
+            out[i, j] = math.sqrt(ss)
+
+@njit(cache=True, fastmath=FASTMATH)
+def rolling_range_vol(o, h, l, c, w):
+    """Rolling w-bar means of the Parkinson and Garman-Klass estimators -> (n, 2)."""
+    # Per-bar values live only in a w-slot ring; each full window is summed
+    # directly (NaN in the window -> NaN, as pandas rolling(w).mean())
+    n = c.shape[0]
+    out = np.full((n, 2), np.nan)
+    park = np.zeros(w)
+    gk = np.zeros(w)
+    for i in range(n):
+        hl2 = math.log(h[i] / l[i]) ** 2
+        park[i % w] = LN2_K * hl2
+        gk[i % w] = 0.5 * hl2 - GK_K * math.log(c[i] / o[i]) ** 2
+        if i + 1 < w: continue
+        sp = 0.0
+        sg = 0.0
+        for j in range(w):
+            sp += park[j]
+            sg += gk[j]
+        out[i, 0] = sp / w
+        out[i, 1] = sg / w
+    return out
+
+@njit(cache=True)
+def vol_regime_features(rv5, rv15, rv30, target):
+    """vol_regime, vol_trend and log(target) in one pass -> (n, 3)."""
+    # No fastmath: must stay bit-identical to the pandas formulas in predict.py
+    n = rv5.shape[0]
+    out = np.empty((n, 3))
+    for i in range(n):
+        out[i, 0] = rv5[i] / (rv30[i] + 1e-9)
+        out[i, 1] = rv5[i] - rv15[i]
+        # Non-positive targets are dropped before training; no log(0) = -inf
+        out[i, 2] = math.log(target[i]) if target[i] > 1e-9 else np.nan
+    return out
+
+@njit(cache=True, fastmath=FASTMATH)
+def rolling_rsi(c, w):
+    """RSI over simple w-bar averages of gains/losses, for every bar (one pass)."""
+    n = c.shape[0]
+    out = np.full(n, np.nan)
+    gains = np.zeros(n)
+    losses = np.zeros(n)
+    for i in range(1, n):
+        # Missing deltas count as 0, like delta.where(...) in pandas
+        d = c[i] - c[i - 1]
+        gains[i] = d if d > 0 else 0.0
+        losses[i] = -d if d < 0 else 0.0
+    for i in range(w - 1, n):
+        gain = 0.0
+        loss = 0.0
+        for j in range(i - w + 1, i + 1):
+            gain += gains[j]
+            loss += losses[j]
+        out[i] = 100 - (100 / (1 + ((gain / w) / (loss / w + 1e-9))))
+    return out
+
+@njit(cache=True, fastmath=FASTMATH)
+def trend_strength(c, fast, slow):
+    """SMA(fast) - SMA(slow) of c for every bar."""
+    n = c.shape[0]
+    out = np.full(n, np.nan)
+    for i in range(slow - 1, n):
+        out[i] = _mean(c, i + 1, fast) - _mean(c, i + 1, slow)
+    return out